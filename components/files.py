@@ -1,3 +1,4 @@
+import os
 import time
 
 from nicegui import ui
@@ -5,18 +6,22 @@ from nicegui import ui
 from startup import data_path
 
 
+output_path = data_path / "output"
+
+
 @ui.refreshable
 def files_component():
-    output_path = data_path / "output"
-    files = sorted(
-        output_path.iterdir(),
-        key=lambda x: x.stat(follow_symlinks=True).st_ctime,
-        reverse=True,
-    )
+    # Stat each entry once and reuse the result for sorting and display
+    with os.scandir(output_path) as entries:
+        files = sorted(
+            ((entry.name, entry.stat().st_ctime) for entry in entries),
+            key=lambda x: x[1],
+            reverse=True,
+        )
     with ui.column().classes("w-full"):
-        for file in files:
-            ext = file.suffix.lower()
-            match ext:
+        for name, created in files:
+            stem, ext = os.path.splitext(name)
+            match ext.lower():
                 case ".pdf":
                     file_type = "PDF"
                 case ".xlsx" | ".xls":
@@ -24,8 +29,8 @@ def files_component():
                 case x:
                     file_type = x.upper()
             ui.link(
-                f"{file.stem} ({file_type}) (created {time.strftime('%-m/%-d/%Y %-I:%M %p', time.localtime(file.stat(follow_symlinks=True).st_ctime))})",
-                target=f"data/output/{file.name}",
+                f"{stem} ({file_type}) (created {time.strftime('%-m/%-d/%Y %-I:%M %p', time.localtime(created))})",
+                target=f"data/output/{name}",
                 new_tab=True,
             )
             ui.separator()
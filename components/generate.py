@@ -1,8 +1,9 @@
+import shutil
 from urllib.parse import parse_qs, urlparse
 
 from nicegui import binding, events, ui
 
-from pipeline.process import PanoptoInput
+from pipeline.process import DOWNLOAD_CHUNK_SIZE, PanoptoInput
 from startup import data_path
 from state import Task
 
@@ -16,7 +17,7 @@ class State:
     def handle_upload(self, upload: events.UploadEventArguments):
         out = data_path / "input" / upload.name
         with open(out, "wb") as f:
-            f.write(upload.content.read())
+            shutil.copyfileobj(upload.content, f, DOWNLOAD_CHUNK_SIZE)
         self.upload = out.as_posix()
 
     @property
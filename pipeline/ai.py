@@ -1,7 +1,7 @@
 import os
 from io import BytesIO
 
-from chatlas import ChatOpenAI, content_image_file, content_pdf_file
+from chatlas import Chat, ChatOpenAI, content_image_file, content_pdf_file
 from openai import AsyncOpenAI
 from pydub import AudioSegment
 
@@ -17,6 +17,11 @@ key = os.environ["OPENAI_API_KEY"]
 whisper_client = AsyncOpenAI(api_key=key)
 
 
+def _chat(model: str, prompt_name: str) -> Chat:
+    """Create a chat session with the named prompt as its system prompt."""
+    return ChatOpenAI(api_key=key, model=model, system_prompt=read_prompt(prompt_name))
+
+
 async def generate_captions(video_path: str) -> list[Caption]:
     video: AudioSegment = AudioSegment.from_file(video_path, format="mp4")
     audio: AudioSegment = (
@@ -45,17 +50,13 @@ async def generate_captions(video_path: str) -> list[Caption]:
 
 
 async def clean_transcript(content: str) -> str:
-    prompt = read_prompt("clean_transcript")
-
-    chat = ChatOpenAI(api_key=key, model=FAST_MODEL, system_prompt=prompt)
+    chat = _chat(FAST_MODEL, "clean_transcript")
     response = await chat.chat_async(content, echo="none")
     return await response.get_content()
 
 
 async def gen_keypoints(content: str, slide_path: str) -> str:
-    prompt = read_prompt("gen_keypoints")
-
-    chat = ChatOpenAI(api_key=key, model=SMART_MODEL, system_prompt=prompt)
+    chat = _chat(SMART_MODEL, "gen_keypoints")
     response = await chat.chat_async(
         content,
         content_image_file(slide_path, resize="high"),
@@ -75,9 +76,7 @@ async def generate_title(html: str) -> str:
 
 async def generate_spreadsheet_helper(filename: str) -> StudyTable:
     """Generate a study table from a PDF file."""
-    prompt = read_prompt("generate_spreadsheet")
-
-    chat = ChatOpenAI(api_key=key, model=SMART_MODEL, system_prompt=prompt)
+    chat = _chat(SMART_MODEL, "generate_spreadsheet")
 
     result = await chat.chat_structured_async(
         content_pdf_file(filename),
@@ -89,9 +88,7 @@ async def generate_spreadsheet_helper(filename: str) -> StudyTable:
 
 async def generate_vignette_questions(filename: str) -> VignetteQuestions:
     """Generate 2-3 step-style vignette multiple choice questions for each learning objective."""
-    prompt = read_prompt("generate_vignette_questions")
-
-    chat = ChatOpenAI(api_key=key, model=SMART_MODEL, system_prompt=prompt)
+    chat = _chat(SMART_MODEL, "generate_vignette_questions")
 
     result = await chat.chat_structured_async(
         content_pdf_file(filename),
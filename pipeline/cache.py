@@ -3,12 +3,17 @@ Durable and thread-safe caching for pipeline stages.
 
 Uses diskcache for persistent, thread-safe storage that survives process restarts.
 Cache keys are based on source_id and stage name to allow resuming failed pipelines.
+Values are stored as JSON-encoded bytes rather than pickled objects, with large
+payloads compressed.
 """
 
+import atexit
 import hashlib
+import json
 import os
-import pickle
-from dataclasses import dataclass
+import zlib
+from dataclasses import asdict, dataclass
+from functools import lru_cache
 from typing import Any
 
 import diskcache
@@ -41,16 +46,49 @@ def close_cache() -> None:
         _cache = None
 
 
+# Release the SQLite connections when the process exits
+atexit.register(close_cache)
+
+
 def clear_cache() -> None:
     """Clear all cached data."""
     cache = get_cache()
     cache.clear()
 
 
+def string_digest(value: str) -> str:
+    """Hash a string into an identifier that, unlike hash(), is stable across runs."""
+    return hashlib.blake2b(value.encode(), digest_size=16).hexdigest()
+
+
 def _generate_cache_key(source_id: str, stage_name: str) -> str:
     """Generate a unique cache key for a stage result."""
-    key_data = f"{source_id}:{stage_name}"
-    return hashlib.sha256(key_data.encode()).hexdigest()
+    return string_digest(f"{source_id}:{stage_name}")
+
+
+def file_digest(path: str) -> str:
+    """
+    Hash a file's contents, reading it in chunks rather than all at once.
+
+    Digests are memoized per process on (path, mtime, size), so an unchanged
+    file is only read once.
+
+    Args:
+        path: Path to the file to hash
+
+    Returns:
+        Hex digest of the file contents
+    """
+    st = os.stat(path)
+    return _file_digest(path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=1024)
+def _file_digest(path: str, mtime_ns: int, size: int) -> str:
+    """Hash a file; mtime_ns and size only serve as part of the memo key."""
+    with open(path, "rb") as f:
+        digest = hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16))
+    return digest.hexdigest()
 
 
 @dataclass
@@ -62,6 +100,34 @@ class CachedResult:
     result: Any
 
 
+# Leading byte identifying how a stored payload is encoded
+_FORMAT_JSON = b"\x01"
+_FORMAT_JSON_ZLIB = b"\x02"
+
+# Payloads larger than this many bytes are compressed before storage
+COMPRESS_THRESHOLD = 4096
+
+
+def _serialize(cached: CachedResult) -> bytes:
+    """Encode a cached result for storage, compressing large payloads."""
+    payload = json.dumps(asdict(cached)).encode()
+    if len(payload) > COMPRESS_THRESHOLD:
+        return _FORMAT_JSON_ZLIB + zlib.compress(payload, 3)
+    return _FORMAT_JSON + payload
+
+
+def _deserialize(data: Any) -> CachedResult | None:
+    """Decode a stored payload, returning None if it is not a cached result."""
+    if not isinstance(data, bytes):
+        return None
+    header, payload = data[:1], data[1:]
+    if header == _FORMAT_JSON_ZLIB:
+        payload = zlib.decompress(payload)
+    elif header != _FORMAT_JSON:
+        return None
+    return CachedResult(**json.loads(payload))
+
+
 def get_cached_result(source_id: str, stage_name: str) -> Any | None:
     """
     Retrieve a cached result for a specific stage.
@@ -77,10 +143,10 @@ def get_cached_result(source_id: str, stage_name: str) -> Any | None:
     key = _generate_cache_key(source_id, stage_name)
 
     try:
-        cached: CachedResult | None = cache.get(key)
+        cached = _deserialize(cache.get(key))
         if cached is not None:
             return cached.result
-    except (pickle.PickleError, Exception):
+    except Exception:
         # If there's an error reading cache, treat as cache miss
         pass
 
@@ -106,8 +172,8 @@ def set_cached_result(source_id: str, stage_name: str, result: Any) -> None:
     )
 
     try:
-        cache.set(key, cached)
-    except (pickle.PickleError, Exception) as e:
+        cache.set(key, _serialize(cached))
+    except Exception as e:
         # Log but don't fail if caching fails
         print(f"Warning: Failed to cache result for {stage_name}: {e}")
 
@@ -141,15 +207,17 @@ def invalidate_source(source_id: str) -> int:
     cache = get_cache()
     count = 0
 
-    # Iterate through all keys and remove those matching the source_id
-    for key in list(cache):
-        try:
-            cached: CachedResult | None = cache.get(key)
-            if cached is not None and cached.source_id == source_id:
-                cache.delete(key)
-                count += 1
-        except Exception:
-            pass
+    # Iterate through all keys and remove those matching the source_id,
+    # batching the lookups and deletes into a single transaction
+    with cache.transact():
+        for key in list(cache):
+            try:
+                cached = _deserialize(cache.get(key))
+                if cached is not None and cached.source_id == source_id:
+                    cache.delete(key)
+                    count += 1
+            except Exception:
+                pass
 
     return count
 
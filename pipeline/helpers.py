@@ -1,4 +1,5 @@
 from collections import namedtuple
+from functools import cache
 from pathlib import Path
 
 import requests
@@ -11,8 +12,9 @@ Progress = namedtuple("Progress", ("stage", "complete", "total"))
 PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
 
 
+@cache
 def read_prompt(name: str) -> str:
-    """Read a prompt from the prompts directory."""
+    """Read a prompt from the prompts directory (memoized per process)."""
     prompt_path = PROMPTS_DIR / f"{name}.md"
     with open(prompt_path, "r", encoding="utf-8") as f:
         return f.read()
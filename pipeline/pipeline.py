@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from typing import Any, Awaitable, Callable, cast
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Progress:
     """Class to represent progress of a pipeline stage."""
 
@@ -25,6 +25,7 @@ class Pipeline[PipelineIn, PipelineOut = PipelineIn]:
         ] = []
         self._callback = callback
         self._current_stage: int | None = None
+        self._last_progress: tuple[str, int] | None = None
         self._logger = logging.getLogger(__name__)
         self._loop = asyncio.get_event_loop()
 
@@ -61,7 +62,7 @@ class Pipeline[PipelineIn, PipelineOut = PipelineIn]:
         Run the pipeline with the given input data.
         Returns the final output after all stages have been applied.
         """
-        if self._loop != asyncio.get_event_loop():
+        if self._loop != asyncio.get_running_loop():
             raise RuntimeError(
                 "Pipeline run called from a different event loop that it was created"
             )
@@ -104,6 +105,12 @@ class Pipeline[PipelineIn, PipelineOut = PipelineIn]:
         if progress is not None:
             complete += 1.0 / total * progress
 
+        # Skip reports that would not change the displayed message or percentage
+        reported = (message, int(complete * 100))
+        if reported == self._last_progress:
+            return
+        self._last_progress = reported
+
         if self._callback:
             self._loop.call_soon_threadsafe(
                 self._callback, self, Progress(message, complete)
@@ -6,9 +6,11 @@ import subprocess
 import tempfile
 import urllib.request
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
+from functools import cached_property
 from tempfile import TemporaryDirectory
-from typing import Callable, cast
+from typing import Callable, Iterable, cast
 from urllib.parse import urljoin
 from uuid import uuid4
 
@@ -17,6 +19,7 @@ import m3u8
 import pandas as pd
 import skimage as ski
 from jinja2 import Environment, FileSystemLoader, select_autoescape
+from openpyxl import Workbook
 from openpyxl.cell.rich_text import CellRichText, TextBlock
 from openpyxl.cell.text import InlineFont
 from openpyxl.styles import Alignment, Font
@@ -30,13 +33,25 @@ from pipeline.ai import (
     generate_title,
     generate_vignette_questions,
 )
-from pipeline.cache import get_cached_result, set_cached_result
+from pipeline.cache import (
+    file_digest,
+    get_cached_result,
+    set_cached_result,
+    string_digest,
+)
 from pipeline.helpers import Caption, Slide, fetch
 
 from .pipeline import Pipeline, PipelineFailure, Progress
 
 in_dir = os.path.join("data", "input")
 out_dir = os.path.join("data", "output")
+frames_dir = os.path.join("data", "frames")
+template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+# Shared so compiled templates are cached across pipeline runs
+template_env = Environment(
+    loader=FileSystemLoader(template_dir), autoescape=select_autoescape()
+)
 
 
 def parse_markdown_bold_to_rich_text(text: str) -> CellRichText | str:
@@ -90,6 +105,9 @@ PanoptoInput = namedtuple("PanoptoInput", ["base", "cookie", "delivery_id"])
 ProcessingInput = str | PanoptoInput
 
 ENABLE_AI = True  # Set to False to disable AI processing
+AI_CONCURRENCY = 8  # Maximum number of concurrent AI requests per pipeline
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # Read size when streaming video downloads
+SEGMENT_DOWNLOAD_WORKERS = 8  # Concurrent segment downloads for m3u8 streams
 
 
 @dataclass
@@ -103,7 +121,7 @@ class ProcessingContext:
     captions: list[Caption] | None = None
     slides: list[Slide] | None = None
 
-    @property
+    @cached_property
     def video_path(self) -> str:
         if isinstance(self.source, str) and os.path.exists(self.source):
             return self.source
@@ -118,12 +136,44 @@ class ProcessingContext:
         set_cached_result(self.source_id, stage_name, result)
 
 
+def _all_files_exist(paths: Iterable[str]) -> bool:
+    """Check that every path exists, listing each parent directory only once."""
+    listings: dict[str, set[str]] = {}
+    for path in paths:
+        parent, name = os.path.split(path)
+        if parent not in listings:
+            try:
+                with os.scandir(parent or ".") as entries:
+                    listings[parent] = {entry.name for entry in entries}
+            except OSError:
+                return False
+        if name not in listings[parent]:
+            return False
+    return True
+
+
 # Utility functions for video download
 def _is_m3u8_url(url: str) -> bool:
     """Check if a URL points to an M3U8 file."""
     return url.endswith(".m3u8") or "m3u8" in url
 
 
+def _download_segment(segment_url: str, segment_path: str, index: int) -> None:
+    """Download a single stream segment, retrying up to 3 times."""
+    for attempt in range(3):
+        try:
+            urllib.request.urlretrieve(segment_url, segment_path)
+            # Verify the segment was downloaded completely
+            if os.path.getsize(segment_path) > 0:
+                break
+        except Exception as e:
+            if attempt == 2:  # Last attempt
+                raise ValueError(
+                    f"Failed to download segment {index} after 3 attempts: {e}"
+                )
+            continue
+
+
 def _download_m3u8_stream(ctx: ProcessingContext, video_url: str) -> None:
     """Download and combine M3U8 stream segments into a single video file."""
     ctx.pipeline.report_progress("Parsing playlist")
@@ -156,33 +206,30 @@ def _download_m3u8_stream(ctx: ProcessingContext, video_url: str) -> None:
 
         # Create a temporary directory for segments
         with tempfile.TemporaryDirectory() as temp_dir:
-            segment_files = []
-
-            # Download each segment with retry logic
-            for i, segment in enumerate(segments):
-                segment_url = urljoin(playlist.base_uri or video_url, segment.uri)
-                segment_path = os.path.join(temp_dir, f"segment_{i:04d}.ts")
-
-                # Retry download up to 3 times
-                for attempt in range(3):
-                    try:
-                        urllib.request.urlretrieve(segment_url, segment_path)
-                        # Verify the segment was downloaded completely
-                        if os.path.getsize(segment_path) > 0:
-                            break
-                    except Exception as e:
-                        if attempt == 2:  # Last attempt
-                            raise ValueError(
-                                f"Failed to download segment {i} after 3 attempts: {e}"
-                            )
-                        continue
-
-                segment_files.append(segment_path)
-
-                # Update progress
-                ctx.pipeline.report_progress(
-                    "Downloading video segments", (i + 1) / total_segments
-                )
+            base_uri = playlist.base_uri or video_url
+            segment_files = [
+                os.path.join(temp_dir, f"segment_{i:04d}.ts")
+                for i in range(total_segments)
+            ]
+
+            # Download segments in parallel; ffmpeg concatenates them in list order
+            with ThreadPoolExecutor(max_workers=SEGMENT_DOWNLOAD_WORKERS) as pool:
+                futures = [
+                    pool.submit(
+                        _download_segment, urljoin(base_uri, segment.uri), path, i
+                    )
+                    for i, (segment, path) in enumerate(zip(segments, segment_files))
+                ]
+                try:
+                    for done, future in enumerate(as_completed(futures), 1):
+                        future.result()
+                        ctx.pipeline.report_progress(
+                            "Downloading video segments", done / total_segments
+                        )
+                except BaseException:
+                    # Don't start the remaining downloads once one has failed
+                    pool.shutdown(cancel_futures=True)
+                    raise
 
             # Use ffmpeg to properly concatenate segments instead of binary concatenation
             ctx.pipeline.report_progress("Combining segments")
@@ -217,7 +264,7 @@ def _download_m3u8_stream(ctx: ProcessingContext, video_url: str) -> None:
                 with open(ctx.video_path, "wb") as outfile:
                     for segment_file in segment_files:
                         with open(segment_file, "rb") as infile:
-                            outfile.write(infile.read())
+                            shutil.copyfileobj(infile, outfile, DOWNLOAD_CHUNK_SIZE)
 
     except urllib.request.HTTPError as e:
         raise PipelineFailure(
@@ -231,18 +278,35 @@ def _download_regular_video(
     ctx: ProcessingContext, video_url: str, use_range_header: bool = True
 ) -> ProcessingContext:
     """Download a regular video file."""
+    request = urllib.request.Request(video_url)
     if use_range_header:
-        opener = urllib.request.build_opener()
-        opener.addheaders = [("Range", "bytes=0-")]
-        urllib.request.install_opener(opener)
-
-    urllib.request.urlretrieve(
-        video_url,
-        ctx.video_path,
-        reporthook=lambda count, bs, ts: ctx.pipeline.report_progress(
-            "Downloading", count * bs / ts
-        ),
-    )
+        request.add_header("Range", "bytes=0-")
+
+    # Stream to a sibling temp file so an interrupted download never leaves a
+    # truncated video at ctx.video_path
+    part_path = ctx.video_path + ".part"
+    try:
+        with (
+            urllib.request.urlopen(request) as response,
+            open(part_path, "wb") as f,
+        ):
+            total = int(response.headers.get("Content-Length") or 0)
+            downloaded = 0
+            while chunk := response.read(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                downloaded += len(chunk)
+                if total:
+                    ctx.pipeline.report_progress("Downloading", downloaded / total)
+
+        if total and downloaded < total:
+            raise urllib.request.ContentTooShortError(
+                f"retrieval incomplete: got only {downloaded} out of {total} bytes",
+                None,
+            )
+        os.replace(part_path, ctx.video_path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
     return ctx
 
 
@@ -292,9 +356,13 @@ def _download_panopto_video(ctx: ProcessingContext) -> ProcessingContext:
 
 def generate_context(pipeline: Pipeline, input: ProcessingInput) -> ProcessingContext:
     """Generate processing context from input."""
-    source_id = (
-        input.delivery_id if isinstance(input, PanoptoInput) else str(hash(input))
-    )
+    if isinstance(input, PanoptoInput):
+        source_id = input.delivery_id
+    elif os.path.exists(input):
+        # Key local files by content so cached stages survive restarts and renames
+        source_id = file_digest(input)
+    else:
+        source_id = string_digest(input)
     return ProcessingContext(
         pipeline,
         source_id,
@@ -313,11 +381,8 @@ def download_video(pipeline: Pipeline, ctx: ProcessingContext) -> ProcessingCont
         pipeline.report_progress("Using cached video", 1.0)
         return ctx
 
-    if (
-        isinstance(ctx.source, str)
-        and os.path.exists(ctx.source)
-        and ctx.source == ctx.video_path
-    ):
+    # video_path resolves to the source itself only for existing local files
+    if ctx.source == ctx.video_path:
         ctx.set_cached(stage_name, {"video_path": ctx.video_path})
         return ctx
 
@@ -364,7 +429,7 @@ def match_frames(pipeline: Pipeline, ctx: ProcessingContext) -> ProcessingContex
     if cached is not None:
         # Verify cached frame images still exist
         slides = [Slide(**s) for s in cached]
-        if all(os.path.exists(s.image) for s in slides):
+        if _all_files_exist(s.image for s in slides):
             pipeline.report_progress("Using cached slides", 1.0)
             ctx.slides = slides
             return ctx
@@ -382,7 +447,7 @@ def match_frames(pipeline: Pipeline, ctx: ProcessingContext) -> ProcessingContex
     stream = cv2.VideoCapture()
     stream.open(ctx.video_path)
 
-    frame_path = os.path.join("data", "frames", ctx.source_id)
+    frame_path = os.path.join(frames_dir, ctx.source_id)
     os.makedirs(frame_path, exist_ok=True)
 
     for idx, cap in enumerate(ctx.captions):
@@ -444,7 +509,7 @@ async def transform_slides_with_ai(
     if cached is not None:
         # Verify cached frame images still exist
         slides = [Slide(**s) for s in cached]
-        if all(os.path.exists(s.image) for s in slides):
+        if _all_files_exist(s.image for s in slides):
             pipeline.report_progress("Using cached AI-transformed slides", 1.0)
             ctx.slides = slides
             return ctx
@@ -453,15 +518,30 @@ async def transform_slides_with_ai(
         """Transform a single slide using AI."""
         cleaned = await clean_transcript(slide.caption)
         keypoints = None
-        # cleaned, keypoints = await asyncio.gather(clean_transcript(slide.caption), gen_keypoints(slide.caption, slide.image))
         return Slide(slide.image, cleaned, keypoints)
 
-    output: list[Slide] = []
-    for idx, slide in enumerate(ctx.slides):
-        ctx.pipeline.report_progress(
-            "Cleaning Transcript with AI", (idx + 1) / len(ctx.slides)
-        )
-        output.append(await transform_slide(slide))
+    sem = asyncio.Semaphore(AI_CONCURRENCY)
+    total = len(ctx.slides)
+    completed = 0
+
+    async def transform_bounded(slide: Slide) -> Slide:
+        """Transform a slide, limiting the number of in-flight AI requests."""
+        nonlocal completed
+        async with sem:
+            result = await transform_slide(slide)
+        completed += 1
+        ctx.pipeline.report_progress("Cleaning Transcript with AI", completed / total)
+        return result
+
+    # A TaskGroup cancels the remaining requests as soon as one fails
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(transform_bounded(s)) for s in ctx.slides]
+    except ExceptionGroup as eg:
+        # Surface the underlying error rather than the group wrapper
+        raise eg.exceptions[0] from eg
+
+    output = [t.result() for t in tasks]
     ctx.slides = output
 
     # Cache the transformed slides
@@ -489,13 +569,7 @@ async def generate_output(pipeline: Pipeline, ctx: ProcessingContext) -> str:
         return cached
 
     pipeline.report_progress("Generating PDF", 0)
-    template_path = os.path.join(
-        os.path.dirname(os.path.dirname(__file__)), "templates"
-    )
-    env = Environment(
-        loader=FileSystemLoader(template_path), autoescape=select_autoescape()
-    )
-    template = env.get_template("template.html")
+    template = template_env.get_template("template.html")
 
     html = template.render(pairs=ctx.slides)
 
@@ -504,7 +578,7 @@ async def generate_output(pipeline: Pipeline, ctx: ProcessingContext) -> str:
     os.makedirs(out_dir, exist_ok=True)
 
     # Run PDF generation in executor since it's CPU-bound
-    await asyncio.get_event_loop().run_in_executor(
+    await asyncio.get_running_loop().run_in_executor(
         None, generate_pdf_output, ctx, html, path
     )
     pipeline.report_progress("Generating PDF", 1.0)
@@ -525,7 +599,9 @@ def compress_pdf(pipeline: Pipeline, input_path: str, quality="ebook") -> str:
                        'printer', 'prepress'). 'ebook' is a good balance.
     """
     stage_name = "compress_pdf"
-    source_id = str(hash(input_path))
+    # Key on content rather than path, since output paths are derived from
+    # lecture titles and can collide
+    source_id = file_digest(input_path)
 
     # Check cache first - if the file exists and matches cached path, skip compression
     cached = get_cached_result(source_id, stage_name)
@@ -564,14 +640,16 @@ def compress_pdf(pipeline: Pipeline, input_path: str, quality="ebook") -> str:
         shutil.move(output_path, input_path)
         pipeline.report_progress("Compressing PDF", 1.0)
 
-    # Cache the result
+    # Cache the result under both the original and the compressed content, as
+    # the file is rewritten in place and reruns see the compressed version
     set_cached_result(source_id, stage_name, input_path)
+    set_cached_result(file_digest(input_path), stage_name, input_path)
     return input_path
 
 
 async def generate_spreadsheet(pipeline: Pipeline, filename: str) -> tuple[str, str]:
     stage_name = "generate_spreadsheet"
-    source_id = str(hash(filename))
+    source_id = file_digest(filename)
 
     # Check cache first
     cached = get_cached_result(source_id, stage_name)
@@ -579,7 +657,7 @@ async def generate_spreadsheet(pipeline: Pipeline, filename: str) -> tuple[str,
         pdf_path, xlsx_path = cached
         if os.path.exists(pdf_path) and os.path.exists(xlsx_path):
             pipeline.report_progress("Using cached Excel sheet", 1.0)
-            return cached
+            return pdf_path, xlsx_path
 
     pipeline.report_progress("Generating Excel Sheet", 0)
 
@@ -601,8 +679,6 @@ async def generate_spreadsheet(pipeline: Pipeline, filename: str) -> tuple[str,
     os.makedirs(out_dir, exist_ok=True)
 
     # Write to Excel with rich text support for Markdown bold
-    from openpyxl import Workbook
-
     wb = Workbook()
     ws = wb.active
     assert ws is not None, "Worksheet not found in the workbook"
@@ -658,7 +734,7 @@ async def generate_vignette_pdf(
     """Generate a PDF with vignette questions for each learning objective."""
     pdf_filename, xlsx_filename = inputs
     stage_name = "generate_vignette_pdf"
-    source_id = str(hash(pdf_filename))
+    source_id = file_digest(pdf_filename)
 
     # Check cache first
     cached = get_cached_result(source_id, stage_name)
@@ -666,7 +742,7 @@ async def generate_vignette_pdf(
         pdf_path, xlsx_path, vignette_path = cached
         if all(os.path.exists(p) for p in [pdf_path, xlsx_path, vignette_path]):
             pipeline.report_progress("Using cached vignette PDF", 1.0)
-            return cached
+            return pdf_path, xlsx_path, vignette_path
 
     pipeline.report_progress("Generating Vignette Questions", 0)
 
@@ -683,13 +759,7 @@ async def generate_vignette_pdf(
     learning_objectives = [lo.model_dump() for lo in vignette_data.learning_objectives]
 
     # Render the HTML template
-    template_path = os.path.join(
-        os.path.dirname(os.path.dirname(__file__)), "templates"
-    )
-    env = Environment(
-        loader=FileSystemLoader(template_path), autoescape=select_autoescape()
-    )
-    template = env.get_template("vignette.html")
+    template = template_env.get_template("vignette.html")
 
     html = template.render(learning_objectives=learning_objectives)
 
@@ -700,11 +770,14 @@ async def generate_vignette_pdf(
 
     pipeline.report_progress("Generating Vignette PDF", 0.7)
 
-    # Generate the PDF
-    with open(vignette_pdf_path, "wb") as f:
-        pisa_status = pisa.CreatePDF(html, dest=f)
-        if hasattr(pisa_status, "err") and getattr(pisa_status, "err", None):
-            raise PipelineFailure("Error generating vignette PDF")
+    def render_pdf() -> None:
+        with open(vignette_pdf_path, "wb") as f:
+            pisa_status = pisa.CreatePDF(html, dest=f)
+            if hasattr(pisa_status, "err") and getattr(pisa_status, "err", None):
+                raise PipelineFailure("Error generating vignette PDF")
+
+    # Run PDF generation in executor since it's CPU-bound
+    await asyncio.get_running_loop().run_in_executor(None, render_pdf)
 
     pipeline.report_progress("Generating Vignette PDF", 1.0)
 
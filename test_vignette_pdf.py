@@ -151,4 +151,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-    main()